@@ -11,12 +11,13 @@ Copyright (c) 2024 Conviction Game Contributors
 Licensed under the MIT License
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import List, Dict, Optional
+from collections import Counter
 import random
 
 # Import the new Bloc class
-from models import Bloc, CardType, COUNTER_TABLE, CARD_EFFECTS
+from models import Bloc, CardType, Province, COUNTER_TABLE, CARD_EFFECTS
 from events import draw_random_event, draw_global_event, should_trigger_global_event
 
 # Unit class commented out - replaced by new architecture
@@ -39,24 +40,7 @@ from events import draw_random_event, draw_global_event, should_trigger_global_e
 #         }
 
 
-@dataclass
-class Province:
-    name: str
-    adjacent_provinces: List[str] = field(default_factory=list)
-    is_supply_center: bool = False
-    controller: Optional[str] = None
-    x: int = 0
-    y: int = 0
-
-    def to_dict(self):
-        return {
-            "name": self.name,
-            "adjacent_to": self.adjacent_provinces,
-            "is_supply_center": self.is_supply_center,
-            "controller": self.controller,
-        }
-
-
+# Province now lives in models.py alongside Bloc
 # Remove the old Power class - it's replaced by Bloc in models.py
 
 
@@ -511,13 +495,15 @@ class ConvictionGame:
         """Generate GDP income for all blocs based on their economic development and territories."""
         print("\n=== GDP INCOME GENERATION ===")
 
+        # Count controlled supply centers for every bloc in a single pass
+        supply_centers = Counter(
+            p.controller
+            for p in self.provinces.values()
+            if p.is_supply_center and p.controller
+        )
+
         for power_name, power in self.powers.items():
-            # Count controlled supply centers
-            controlled_territories = sum(
-                1
-                for p in self.provinces.values()
-                if p.is_supply_center and p.controller == power_name
-            )
+            controlled_territories = supply_centers[power_name]
 
             # Generate income
             income = power.generate_gdp_income(controlled_territories)
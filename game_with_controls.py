@@ -5,10 +5,10 @@ This connects the web UI to your actual game engine.
 """
 
 import asyncio
-import json
-from typing import Dict
-from models import Bloc, ProxyRegion, CardType
-from web_bridge import ConvictionWebBridge
+import signal
+from collections import Counter
+from models import Bloc, CardType, Province, CARD_BY_NAME, PROVINCE_NAMES
+from web_bridge import ConvictionWebBridge, install_uvloop
 
 
 class ConvictionGameWithControls:
@@ -22,22 +22,17 @@ class ConvictionGameWithControls:
             'China': Bloc(name='China', gdp_tokens=12)
         }
         
-        self.provinces = {
-            'Arctic Council': type('Province', (), {'name': 'Arctic Council', 'controller': None}),
-            'North Atlantic': type('Province', (), {'name': 'North Atlantic', 'controller': None}),
-            'Latin America': type('Province', (), {'name': 'Latin America', 'controller': None}),
-            'Africa': type('Province', (), {'name': 'Africa', 'controller': None}),
-            'Middle East': type('Province', (), {'name': 'Middle East', 'controller': None}),
-            'Central Asia': type('Province', (), {'name': 'Central Asia', 'controller': None}),
-            'S.E. Asia': type('Province', (), {'name': 'S.E. Asia', 'controller': None}),
-            'Pacific Rim': type('Province', (), {'name': 'Pacific Rim', 'controller': None}),
-            'Indo-Pacific': type('Province', (), {'name': 'Indo-Pacific', 'controller': None})
-        }
+        self.provinces = {name: Province(name=name) for name in PROVINCE_NAMES}
         
         self.turn = 1
         self.phase = 'Planning'
         self.turn_submissions = {}
         
+        # Web UI action name -> coroutine handling it
+        self._action_handlers = {
+            'submit_turn': self._on_submit_turn,
+        }
+        
         # Web server
         self.web_server = None
     
@@ -51,9 +46,9 @@ class ConvictionGameWithControls:
         self.web_server.handle_player_action = self.handle_player_action
         
         # Start server
+        # run() returns once the site is bound and accepting connections
         runner = await self.web_server.run('localhost', 8080)
         
-        await asyncio.sleep(3)
         print("🎮 Conviction game started!")
         print("📱 Open browser to play: http://localhost:8080")
         
@@ -61,44 +56,47 @@ class ConvictionGameWithControls:
     
     async def handle_player_action(self, ws, data):
         """Process player actions from the web UI."""
-        action = data.get('action')
+        handler = self._action_handlers.get(data.get('action'))
+        if handler:
+            await handler(ws, data)
+    
+    async def _on_submit_turn(self, ws, data):
+        """Record a bloc's budget and card, processing the turn once all are in."""
+        bloc_name = data.get('bloc')
+        budget = data.get('budget')
+        card = data.get('card')
         
-        if action == 'submit_turn':
-            bloc_name = data.get('bloc')
-            budget = data.get('budget')
-            card = data.get('card')
-            
-            print(f"\n{bloc_name} submitted:")
-            print(f"  Budget: {budget}")
-            print(f"  Card: {card}")
-            
-            # Store submission
-            self.turn_submissions[bloc_name] = {
-                'budget': budget,
-                'card': CardType[card] if card else None
-            }
-            
-            # Apply budget to bloc
-            bloc = self.powers[bloc_name]
-            bloc.allocate_budget({
-                'military': budget.get('military', 0),
-                'technology': budget.get('technology', 0),
-                'culture': budget.get('culture', 0),
-                'infrastructure': budget.get('infrastructure', 0),
-                'diplomacy': budget.get('diplomacy', 0)
-            })
-            bloc.chosen_card = CardType[card] if card else None
-            
-            # Send confirmation
-            await ws.send_str(json.dumps({
-                'type': 'turn_submitted',
-                'bloc': bloc_name,
-                'accepted': True
-            }))
-            
-            # Check if all submitted
-            if len(self.turn_submissions) == 3:
-                await self.process_turn()
+        print(f"\n{bloc_name} submitted:")
+        print(f"  Budget: {budget}")
+        print(f"  Card: {card}")
+        
+        # Store submission
+        self.turn_submissions[bloc_name] = {
+            'budget': budget,
+            'card': CARD_BY_NAME.get(card)
+        }
+        
+        # Apply budget to bloc
+        bloc = self.powers[bloc_name]
+        bloc.allocate_budget({
+            'military': budget.get('military', 0),
+            'technology': budget.get('technology', 0),
+            'culture': budget.get('culture', 0),
+            'infrastructure': budget.get('infrastructure', 0),
+            'diplomacy': budget.get('diplomacy', 0)
+        })
+        bloc.chosen_card = CARD_BY_NAME.get(card)
+        
+        # Send confirmation
+        await self.web_server.send_message(ws, {
+            'type': 'turn_submitted',
+            'bloc': bloc_name,
+            'accepted': True
+        })
+        
+        # Check if all submitted
+        if len(self.turn_submissions) == 3:
+            await self.process_turn()
     
     async def process_turn(self):
         """Process the complete turn."""
@@ -106,37 +104,41 @@ class ConvictionGameWithControls:
         print(f"PROCESSING TURN {self.turn}")
         print("="*50)
         
-        # 1. Apply budget spending
-        await self.apply_budgets()
-        
-        # 2. Resolve card plays
-        await self.resolve_cards()
-        
-        # 3. Resolve influence contests
-        await self.resolve_influence()
-        
-        # 4. Generate income
-        await self.generate_income()
-        
-        # 5. Update scores
-        await self.update_scores()
-        
-        # Reset for next turn
-        self.turn_submissions = {}
-        self.turn += 1
-        
-        # Update UI
-        await self.web_server.update_turn_phase(
-            self.turn, 
-            'Planning'
-        )
-        
-        # Send updated game state
-        state = self.web_server.serialize_game_state()
-        await self.web_server.broadcast_update(
-            'game_state',
-            state
-        )
+        # Collect this turn's updates and send them to clients as one frame
+        self.web_server.start_batch()
+        try:
+            # 1. Apply budget spending
+            await self.apply_budgets()
+            
+            # 2. Resolve card plays
+            await self.resolve_cards()
+            
+            # 3. Resolve influence contests
+            await self.resolve_influence()
+            
+            # 4. Generate income
+            await self.generate_income()
+            
+            # 5. Update scores
+            await self.update_scores()
+            
+            # Reset for next turn
+            self.turn_submissions = {}
+            self.turn += 1
+            
+            # Update UI
+            await self.web_server.update_turn_phase(
+                self.turn, 
+                'Planning'
+            )
+            
+            # Send what changed this turn; clients got the full state on connect
+            await self.web_server.broadcast_state_delta()
+            # Lets clients (and tests) know the turn has fully resolved
+            await self.web_server.broadcast_update('turn_processed', {'turn': self.turn - 1})
+        finally:
+            # Always close the batch, or every later broadcast would be held back
+            await self.web_server.flush_batch()
     
     async def apply_budgets(self):
         """Apply budget spending effects."""
@@ -194,14 +196,14 @@ class ConvictionGameWithControls:
         """Generate GDP income."""
         print("\n💰 Generating income...")
         
+        # Count controlled regions for every bloc in a single pass
+        controlled = Counter(
+            province.controller for province in self.provinces.values()
+            if province.controller
+        )
+        
         for bloc_name, bloc in self.powers.items():
-            # Count controlled regions
-            controlled = sum(
-                1 for province in self.provinces.values()
-                if province.controller == bloc_name
-            )
-            
-            income = bloc.generate_gdp_income(controlled)
+            income = bloc.generate_gdp_income(controlled[bloc_name])
             bloc.gdp_tokens += income
             print(f"  {bloc_name}: +{income} GDP (Total: {bloc.gdp_tokens})")
         
@@ -225,10 +227,19 @@ class ConvictionGameWithControls:
         """Run the game loop."""
         runner = await self.start()
         
-        # Game continues until interrupted
+        # Game continues until Ctrl+C / SIGTERM resolves the stop future
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+            except NotImplementedError:
+                # Windows event loops have no signal handlers; Ctrl+C still
+                # cancels the task and falls through to cleanup below
+                pass
+        
         try:
-            await asyncio.Event().wait()
-        except KeyboardInterrupt:
+            await stop
             print("\nGame ended by user.")
         finally:
             await runner.cleanup()
@@ -241,4 +252,5 @@ async def main():
 
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
@@ -1,9 +1,48 @@
 # models.py  (new file — helps keep things tidy)
 from __future__ import annotations
+import sys
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from typing import Dict, List, Optional, Set
 
+# Slotted dataclasses need Python 3.10+; older interpreters keep a __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Proxy regions shown on the web map, in display order
+PROVINCE_NAMES = (
+    "Arctic Council", "North Atlantic", "Latin America", "Africa", "Middle East",
+    "Central Asia", "S.E. Asia", "Pacific Rim", "Indo-Pacific",
+)
+
+# Victory-point bonus indexed by tech level (0-3)
+_TECH_BONUS = (0, 1, 2, 5)
+
+# Bumped by every field assignment on a model (and by mark_changed()), so
+# caches of serialized game state can tell they are stale on their own
+_mutations = 0
+
+
+def mutation_count() -> int:
+    """Counter that changes whenever any Province, ProxyRegion or Bloc does."""
+    return _mutations
+
+
+def mark_changed() -> None:
+    """Record a change assignment can't see, e.g. an in-place list edit."""
+    global _mutations
+    _mutations += 1
+
+
+class _Tracked:
+    """Base for models whose field assignments count as state changes."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        global _mutations
+        _mutations += 1
+        object.__setattr__(self, name, value)
+
 
 class TechLevel(Enum):
     AI_UTILITY = 1
@@ -24,6 +63,9 @@ class CardType(Enum):
     CONTENT_MODERATION = auto()
 
 
+# Card lookup by name for client payloads; .get() avoids Enum.__getitem__
+CARD_BY_NAME: Dict[str, CardType] = {m.name: m for m in CardType}
+
 # Card counter relationships (rock-paper-scissors style)
 COUNTER_TABLE = {
     CardType.CYBER_ESPIONAGE: CardType.COUNTER_INTEL,
@@ -83,15 +125,33 @@ CARD_EFFECTS = {
 }
 
 
-@dataclass
-class ProxyRegion:
+@dataclass(**_SLOTS)
+class Province(_Tracked):
+    name: str
+    adjacent_provinces: List[str] = field(default_factory=list)
+    is_supply_center: bool = False
+    controller: Optional[str] = None
+    x: int = 0
+    y: int = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "adjacent_to": self.adjacent_provinces,
+            "is_supply_center": self.is_supply_center,
+            "controller": self.controller,
+        }
+
+
+@dataclass(**_SLOTS)
+class ProxyRegion(_Tracked):
     name: str
     controlling_bloc: Optional[str] = None  # "USA" / "EU" / "China"
     influence_die: int = 3  # Starts neutral (1-6; 1-2 USA, 3-4 Neutral, 5-6 rival)
 
 
-@dataclass
-class Bloc:
+@dataclass(**_SLOTS)
+class Bloc(_Tracked):
     """A major power in the game (USA, EU, China)."""
 
     name: str
@@ -100,16 +160,12 @@ class Bloc:
     # Economic & resource pool
     gdp_tokens: int = 5
 
-    # NEW: Budgeting system
-    current_budget: Dict[str, int] = field(
-        default_factory=lambda: {
-            "military": 0,
-            "technology": 0,
-            "culture": 0,
-            "infrastructure": 0,
-            "diplomacy": 0,
-        }
-    )
+    # NEW: Budgeting system (GDP allocated to each category this turn)
+    budget_military: int = 0
+    budget_technology: int = 0
+    budget_culture: int = 0
+    budget_infrastructure: int = 0
+    budget_diplomacy: int = 0
 
     # Economic infrastructure
     economic_development: int = 1  # multiplier for GDP generation
@@ -133,12 +189,23 @@ class Bloc:
     colour: str = ""  # useful for ASCII map
 
     # ---------- helpers ----------
+    @property
+    def current_budget(self) -> Dict[str, int]:
+        """This turn's allocation keyed by category (wire / display format)."""
+        return {
+            "military": self.budget_military,
+            "technology": self.budget_technology,
+            "culture": self.budget_culture,
+            "infrastructure": self.budget_infrastructure,
+            "diplomacy": self.budget_diplomacy,
+        }
+
     def effective_drag(self) -> int:
         """Drag after trust is netted out."""
         return max(self.regulatory_drag - self.trust_score, 0)
 
     def tech_bonus(self) -> int:
-        return {0: 0, 1: 1, 2: 2, 3: 5}[self.tech_level]  # tweak later
+        return _TECH_BONUS[self.tech_level]  # tweak later
 
     def generate_gdp_income(self, controlled_territories: int = 0) -> int:
         """Calculate GDP income for this turn based on economic development and territories."""
@@ -171,13 +238,11 @@ class Bloc:
             return False  # Can't spend more than available
 
         # Reset current budget and apply allocations
-        self.current_budget = {
-            "military": allocations.get("military", 0),
-            "technology": allocations.get("technology", 0),
-            "culture": allocations.get("culture", 0),
-            "infrastructure": allocations.get("infrastructure", 0),
-            "diplomacy": allocations.get("diplomacy", 0),
-        }
+        self.budget_military = allocations.get("military", 0)
+        self.budget_technology = allocations.get("technology", 0)
+        self.budget_culture = allocations.get("culture", 0)
+        self.budget_infrastructure = allocations.get("infrastructure", 0)
+        self.budget_diplomacy = allocations.get("diplomacy", 0)
 
         # Spend the allocated GDP tokens
         self.gdp_tokens -= total_allocated
@@ -189,19 +254,20 @@ class Bloc:
         results = []
 
         # Military spending
-        if self.current_budget["military"] > 0:
-            military_gain = min(
-                2, self.current_budget["military"]
-            )  # Max 2 points per turn
+        spent = self.budget_military
+        if spent > 0:
             old_military = self.military_posture
-            self.military_posture = min(5, self.military_posture + military_gain)
-            actual_gain = self.military_posture - old_military
+            new_military = old_military + (spent if spent < 2 else 2)  # Max 2 per turn
+            if new_military > 5:
+                new_military = 5
+            self.military_posture = new_military
+            actual_gain = new_military - old_military
             if actual_gain > 0:
                 results.append(f"Military spending: +{actual_gain} Military Posture")
 
         # Technology spending
-        if self.current_budget["technology"] > 0:
-            tech_progress = self.current_budget["technology"]
+        if self.budget_technology > 0:
+            tech_progress = self.budget_technology
             # Technology advancement requires more investment at higher levels
             threshold = 3 + self.tech_level * 2
             if tech_progress >= threshold and self.tech_level < 3:
@@ -217,17 +283,20 @@ class Bloc:
                 )
 
         # Cultural spending
-        if self.current_budget["culture"] > 0:
-            culture_gain = min(2, self.current_budget["culture"])
+        spent = self.budget_culture
+        if spent > 0:
             old_culture = self.cultural_influence
-            self.cultural_influence = min(5, self.cultural_influence + culture_gain)
-            actual_gain = self.cultural_influence - old_culture
+            new_culture = old_culture + (spent if spent < 2 else 2)
+            if new_culture > 5:
+                new_culture = 5
+            self.cultural_influence = new_culture
+            actual_gain = new_culture - old_culture
             if actual_gain > 0:
                 results.append(f"Cultural programs: +{actual_gain} Cultural Influence")
 
         # Infrastructure spending
-        if self.current_budget["infrastructure"] > 0:
-            infra_spending = self.current_budget["infrastructure"]
+        if self.budget_infrastructure > 0:
+            infra_spending = self.budget_infrastructure
             if infra_spending >= 3:  # Major infrastructure investment
                 self.economic_development += 1
                 self.regulatory_drag = max(
@@ -237,60 +306,61 @@ class Bloc:
                     "Infrastructure development: +1 Economic Development, -1 Regulatory Drag"
                 )
             elif infra_spending >= 2:  # Moderate investment
-                self.cohesion = min(5, self.cohesion + 1)
+                self.cohesion = self.cohesion + 1 if self.cohesion < 5 else 5
                 results.append("Infrastructure maintenance: +1 Cohesion")
             else:  # Minor investment
                 results.append("Minor infrastructure repairs: No immediate effect")
 
         # Diplomatic spending
-        if self.current_budget["diplomacy"] > 0:
-            diplo_gain = min(2, self.current_budget["diplomacy"])
+        spent = self.budget_diplomacy
+        if spent > 0:
             old_trust = self.trust_score
-            self.trust_score = min(5, self.trust_score + diplo_gain)
-            actual_gain = self.trust_score - old_trust
+            new_trust = old_trust + (spent if spent < 2 else 2)
+            if new_trust > 5:
+                new_trust = 5
+            self.trust_score = new_trust
+            actual_gain = new_trust - old_trust
             if actual_gain > 0:
                 results.append(f"Diplomatic initiatives: +{actual_gain} Trust Score")
 
         # Clear budget after spending
-        self.current_budget = {k: 0 for k in self.current_budget.keys()}
+        self.budget_military = 0
+        self.budget_technology = 0
+        self.budget_culture = 0
+        self.budget_infrastructure = 0
+        self.budget_diplomacy = 0
 
         return results
 
     def bloc_vp(self) -> int:
         """Calculate victory points for this bloc using the new scoring system."""
-        # Base victory points from core attributes
-        vp = 0
-
-        # GDP tokens contribute to victory
-        vp += self.gdp_tokens
-
-        # Tech level provides exponential advantage
-        vp += self.tech_bonus()
-
-        # Military posture provides direct victory points
-        vp += self.military_posture * 2
-
-        # Cultural influence provides victory points
-        vp += self.cultural_influence
-
-        # Cohesion provides stability bonus
-        vp += self.cohesion
-
-        # Satellite states provide victory points
-        vp += len(self.satellites) * 3
-
-        # Alliance network provides diplomatic victory points
-        vp += len(self.alliances) * 2
-
+        return self.bloc_vp_breakdown()["total"]
+
+    def bloc_vp_breakdown(self) -> Dict[str, int]:
+        """bloc_vp() together with the contribution of each scoring component."""
+        parts = {
+            "gdp": self.gdp_tokens,
+            # Tech level provides exponential advantage
+            "tech_bonus": self.tech_bonus(),
+            "military": self.military_posture * 2,
+            "culture": self.cultural_influence,
+            # Cohesion provides stability bonus
+            "cohesion": self.cohesion,
+            "satellites": len(self.satellites) * 3,
+            "alliances": len(self.alliances) * 2,
+        }
         # Penalty for high regulatory drag
-        vp -= self.effective_drag()
-
-        return max(0, vp)  # Victory points can't be negative
+        effective_drag = self.effective_drag()
+        total = max(0, sum(parts.values()) - effective_drag)  # Victory points can't be negative
+        parts["effective_drag"] = effective_drag
+        parts["total"] = total
+        return parts
 
     def to_dict(self):
+        vp = self.bloc_vp_breakdown()
         return {
             "name": self.name,
-            "satellites": self.satellites,
+            "satellites": list(self.satellites),
             "gdp_tokens": self.gdp_tokens,
             "current_budget": self.current_budget,
             "economic_development": self.economic_development,
@@ -302,8 +372,8 @@ class Bloc:
                 "cultural_influence": self.cultural_influence,
                 "regulatory_drag": self.regulatory_drag,
                 "trust": self.trust_score,
-                "effective_drag": self.effective_drag(),
+                "effective_drag": vp["effective_drag"],
             },
             "alliances": list(self.alliances),
-            "victory_points": self.bloc_vp(),
+            "victory_points": vp["total"],
         }
@@ -5,8 +5,8 @@ Run this to test the new control interface.
 """
 
 import asyncio
-from models import Bloc, ProxyRegion
-from web_bridge import ConvictionWebBridge
+from models import Bloc, Province, PROVINCE_NAMES
+from web_bridge import ConvictionWebBridge, install_uvloop
 
 
 async def demo_with_controls():
@@ -23,17 +23,11 @@ async def demo_with_controls():
                 'EU': Bloc(name='EU', gdp_tokens=8), 
                 'China': Bloc(name='China', gdp_tokens=12)
             }
-            self.provinces = {
-                'Arctic Council': type('Province', (), {'name': 'Arctic Council', 'controller': None}),
-                'North Atlantic': type('Province', (), {'name': 'North Atlantic', 'controller': 'USA'}),
-                'Latin America': type('Province', (), {'name': 'Latin America', 'controller': 'USA'}),
-                'Africa': type('Province', (), {'name': 'Africa', 'controller': 'EU'}),
-                'Middle East': type('Province', (), {'name': 'Middle East', 'controller': None}),
-                'Central Asia': type('Province', (), {'name': 'Central Asia', 'controller': 'China'}),
-                'S.E. Asia': type('Province', (), {'name': 'S.E. Asia', 'controller': 'China'}),
-                'Pacific Rim': type('Province', (), {'name': 'Pacific Rim', 'controller': None}),
-                'Indo-Pacific': type('Province', (), {'name': 'Indo-Pacific', 'controller': None})
-            }
+            self.provinces = {name: Province(name=name) for name in PROVINCE_NAMES}
+            for name, owner in (('North Atlantic', 'USA'), ('Latin America', 'USA'),
+                                ('Africa', 'EU'), ('Central Asia', 'China'),
+                                ('S.E. Asia', 'China')):
+                self.provinces[name].controller = owner
             self.turn = 1
             self.phase = 'Planning'
     
@@ -84,8 +78,7 @@ async def demo_with_controls():
                     game.powers['China'].gdp_tokens += 4
                     
                     # Send updated state
-                    state = server.serialize_game_state()
-                    await server.broadcast_update('game_state', state)
+                    await server.broadcast_game_state()
                     print("   💰 GDP income distributed")
                 
                 await asyncio.sleep(5)
@@ -107,6 +100,7 @@ async def demo_with_controls():
 
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(demo_with_controls())
     except KeyboardInterrupt:
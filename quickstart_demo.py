@@ -1,21 +1,39 @@
 # quickstart_demo.py - Quick demonstration of Conviction with web visualization
+import argparse
 import asyncio
+import os
+import random
+import sys
+import threading
 import webbrowser
-import time
+from os.path import isfile
 from conviction import ConvictionGame
-from web_bridge import ConvictionWebBridge
+from web_bridge import ConvictionWebBridge, install_uvloop
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fixed seed so every demo run plays out the same contests
+_rng = random.Random(0xC0FFEE)
+
 class ConvictionDemo:
     """Interactive demo of the Conviction game with web visualization."""
     
-    def __init__(self):
+    def __init__(self, interactive: bool = True, headless: bool = False):
         self.game = ConvictionGame()
+        # Pause for Enter between steps; False runs straight through
+        self.interactive = interactive
+        # Skip launching a browser (CI, benchmarks, remote shells)
+        self.headless = headless
         self.bridge = ConvictionWebBridge(self.game)
         self.running = False
+        # State updates waiting for the writer; created once the loop runs
+        self._pending: asyncio.Queue = None
+        # Background tasks, held so they aren't garbage collected mid-run
+        self._bg = set()
+        # Pending demo_proxy_contest results, applied after the page reveals them
+        self._reveal: asyncio.Task = None
     
     async def start_demo(self):
         """Start the demo with web visualization."""
@@ -26,20 +44,27 @@ class ConvictionDemo:
         # Start the web server
         print("🚀 Starting web visualization server...")
         runner = await self.bridge.run(host='localhost', port=8080)
+        self._pending = asyncio.Queue()
+        self._spawn(self._drain_writer())
         
         # Give the server a moment to start
         await asyncio.sleep(1)
         
         print("✅ Server started at http://localhost:8080")
         print()
-        print("🌐 Opening web browser...")
         
-        # Open the browser
-        try:
-            webbrowser.open('http://localhost:8080')
-        except Exception as e:
-            print(f"Could not open browser automatically: {e}")
-            print("Please manually open: http://localhost:8080")
+        if self.headless:
+            print("🖥️ Headless mode: open http://localhost:8080 to watch")
+        else:
+            print("🌐 Opening web browser...")
+            
+            # Open the browser off the event loop; launching it can block
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, webbrowser.open, 'http://localhost:8080')
+            except Exception as e:
+                print(f"Could not open browser automatically: {e}")
+                print("Please manually open: http://localhost:8080")
         
         print()
         print("📋 Demo Instructions:")
@@ -59,6 +84,15 @@ class ConvictionDemo:
             print("\n🛑 Demo interrupted by user")
         finally:
             print("\n🔄 Shutting down server...")
+            # Without pauses the last updates may still be queued; send them first
+            try:
+                if self._reveal is not None:
+                    await asyncio.wait_for(self._reveal, timeout=5)
+                await asyncio.wait_for(self._pending.join(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            for task in list(self._bg):
+                task.cancel()
             await runner.cleanup()
             print("✅ Demo completed!")
     
@@ -69,7 +103,7 @@ class ConvictionDemo:
         
         # Initialize game
         self.game.create_simple_map()
-        await self.update_visualization()
+        self.update_visualization()
         
         # Demo sequence
         demos = [
@@ -85,25 +119,28 @@ class ConvictionDemo:
             print(f"📍 {demo_name}")
             print("-" * 30)
             await demo_func()
-            await self.update_visualization()
+            self.update_visualization()
             await self.wait_for_user()
             print()
     
     async def demo_initial_state(self):
         """Show the initial game state."""
-        print("🏛️ Three major power blocs compete for global influence:")
-        print()
+        # Collect the report and write it once rather than a print per line
+        lines = ["🏛️ Three major power blocs compete for global influence:", ""]
         
         for name, bloc in self.game.powers.items():
-            print(f"  {name}:")
-            print(f"    💰 GDP: {bloc.gdp_tokens}")
-            print(f"    🤝 Cohesion: {bloc.cohesion}")
-            print(f"    🔬 Tech Level: {bloc.tech_level}")
-            print(f"    ⚔️ Military: {bloc.military_posture}")
-            print(f"    🎭 Culture: {bloc.cultural_influence}")
-            print()
+            lines += [
+                f"  {name}:",
+                f"    💰 GDP: {bloc.gdp_tokens}",
+                f"    🤝 Cohesion: {bloc.cohesion}",
+                f"    🔬 Tech Level: {bloc.tech_level}",
+                f"    ⚔️ Military: {bloc.military_posture}",
+                f"    🎭 Culture: {bloc.cultural_influence}",
+                "",
+            ]
         
-        print("🗺️ Proxy regions start neutral, ready to be influenced...")
+        lines.append("🗺️ Proxy regions start neutral, ready to be influenced...")
+        print("\n".join(lines))
     
     async def demo_budget_allocation(self):
         """Demonstrate budget allocation system."""
@@ -139,39 +176,50 @@ class ConvictionDemo:
         
         # Simulate some region contests
         regions_to_contest = ["North", "South", "East"]
+        contestants = ["Red", "Blue"]
+        winners = _rng.choices(contestants, k=len(regions_to_contest))
+        outcomes = []
         
-        for region_name in regions_to_contest:
+        for region_name, winner in zip(regions_to_contest, winners):
             region = self.game.provinces.get(region_name)
             if not region:
                 continue
             
             print(f"📍 Contest for {region_name}:")
-            
-            # Simulate contest outcomes
-            import random
-            contestants = ["Red", "Blue"]
-            winner = random.choice(contestants)
-            
-            region.controller = winner
-            
             print(f"    🏆 {winner} gains control")
-            await asyncio.sleep(1)  # Brief pause for effect
+            outcomes.append({'region': region_name, 'winner': winner, 'delay_ms': 1000})
+        
+        # One event for every result; the page staggers them for effect
+        self._pending.put_nowait({'type': 'contest_batch', 'data': outcomes})
+        # A patch in the same frame would redraw every region at once, so
+        # the new controllers only reach the state once the reveal has played
+        self._reveal = self._spawn(self._apply_contest_results(outcomes))
+    
+    async def _apply_contest_results(self, outcomes):
+        """Record contest winners after the page's staggered reveal."""
+        await asyncio.sleep(sum(outcome['delay_ms'] for outcome in outcomes) / 1000)
+        for outcome in outcomes:
+            self.game.provinces[outcome['region']].controller = outcome['winner']
+        self.update_visualization()
     
     async def demo_tech_development(self):
         """Show technology development effects."""
-        print("🔬 Technology development creates advantages but also friction:")
-        print()
+        lines = ["🔬 Technology development creates advantages but also friction:", ""]
         
         for name, bloc in self.game.powers.items():
             if bloc.tech_level > 0:
                 bonus = bloc.tech_bonus()
                 drag = bloc.effective_drag()
-                print(f"  {name}:")
-                print(f"    🔬 Tech Level: {bloc.tech_level} (Bonus: +{bonus})")
-                print(f"    📋 Regulatory Drag: {bloc.regulatory_drag}")
-                print(f"    🤝 Trust Score: {bloc.trust_score}")
-                print(f"    ⚖️ Effective Drag: {drag}")
-                print()
+                lines += [
+                    f"  {name}:",
+                    f"    🔬 Tech Level: {bloc.tech_level} (Bonus: +{bonus})",
+                    f"    📋 Regulatory Drag: {bloc.regulatory_drag}",
+                    f"    🤝 Trust Score: {bloc.trust_score}",
+                    f"    ⚖️ Effective Drag: {drag}",
+                    "",
+                ]
+        
+        print("\n".join(lines))
     
     async def demo_military_buildup(self):
         """Show military competition effects."""
@@ -195,64 +243,103 @@ class ConvictionDemo:
     
     async def demo_final_scoring(self):
         """Show final victory point calculation."""
-        print("🏆 Victory Point Calculation:")
-        print()
+        lines = ["🏆 Victory Point Calculation:", ""]
         
         scores = []
         for name, bloc in self.game.powers.items():
-            vp = bloc.bloc_vp()
-            scores.append((name, vp))
+            vp = bloc.bloc_vp_breakdown()
+            scores.append((name, vp['total']))
             
-            print(f"  {name}: {vp} Victory Points")
-            print(f"    💰 GDP Tokens: {bloc.gdp_tokens}")
-            print(f"    🔬 Tech Bonus: {bloc.tech_bonus()}")
-            print(f"    ⚔️ Military: {bloc.military_posture * 2}")
-            print(f"    🎭 Culture: {bloc.cultural_influence}")
-            print(f"    🤝 Cohesion: {bloc.cohesion}")
-            print(f"    🌍 Satellites: {len(bloc.satellites) * 3}")
-            print(f"    🤝 Alliances: {len(bloc.alliances) * 2}")
-            print(f"    📋 Drag Penalty: -{bloc.effective_drag()}")
-            print()
+            lines += [
+                f"  {name}: {vp['total']} Victory Points",
+                f"    💰 GDP Tokens: {vp['gdp']}",
+                f"    🔬 Tech Bonus: {vp['tech_bonus']}",
+                f"    ⚔️ Military: {vp['military']}",
+                f"    🎭 Culture: {vp['culture']}",
+                f"    🤝 Cohesion: {vp['cohesion']}",
+                f"    🌍 Satellites: {vp['satellites']}",
+                f"    🤝 Alliances: {vp['alliances']}",
+                f"    📋 Drag Penalty: -{vp['effective_drag']}",
+                "",
+            ]
         
         # Determine winner
         scores.sort(key=lambda x: x[1], reverse=True)
         winner_name, winner_score = scores[0]
         
-        print(f"🥇 WINNER: {winner_name} with {winner_score} Victory Points!")
+        lines.append(f"🥇 WINNER: {winner_name} with {winner_score} Victory Points!")
         
         if len(scores) > 1:
             margin = winner_score - scores[1][1]
-            print(f"   Victory margin: {margin} points")
+            lines.append(f"   Victory margin: {margin} points")
+        
+        print("\n".join(lines))
     
-    async def update_visualization(self):
-        """Update the web visualization with current game state."""
-        # Broadcast current state to all connected clients
-        state = self.bridge.serialize_game_state()
-        await self.bridge.broadcast_update('full_state', state)
+    def update_visualization(self):
+        """Queue a visualization update; never waits on the browser clients."""
+        # Queue only what changed; the writer sends whatever has piled up as one frame
+        delta = self.bridge.state_delta()
+        if delta is not None:
+            self._pending.put_nowait(delta)
+    
+    def _spawn(self, coro):
+        """Run a coroutine in the background, tracked until it finishes."""
+        task = asyncio.create_task(coro)
+        self._bg.add(task)
+        task.add_done_callback(self._bg.discard)
+        return task
+    
+    async def _drain_writer(self):
+        """Send queued updates, combining everything pending into one 'batch' frame."""
+        while True:
+            batch = [await self._pending.get()]
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await self.bridge.broadcast_update('batch', batch)
+            for _ in batch:
+                self._pending.task_done()
     
     async def wait_for_user(self):
-        """Wait for user input to continue."""
-        print("👆 Press Enter to continue (or Ctrl+C to exit)...")
+        """Wait for the user to press Enter, keeping the server responsive."""
+        if not self.interactive:
+            return
+        
+        # input() blocks, so read it on a daemon thread: the event loop keeps
+        # serving WebSocket clients, and Ctrl+C isn't held up at shutdown by
+        # a worker thread still waiting on stdin
+        loop = asyncio.get_running_loop()
+        pressed = loop.create_future()
         
-        # In an async context, we need to handle input differently
-        # For demo purposes, just wait a few seconds
-        await asyncio.sleep(3)
+        def read_line():
+            try:
+                input("👆 Press Enter to continue (or Ctrl+C to exit)...")
+            except EOFError:
+                pass
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(lambda: pressed.done() or pressed.set_result(None))
+        
+        threading.Thread(target=read_line, daemon=True).start()
+        await pressed
 
-def main():
+def main(argv=None):
     """Main entry point for the demo."""
+    parser = argparse.ArgumentParser(description="Conviction 2040 web visualization demo")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="run every demo step without pausing for Enter")
+    parser.add_argument('--headless', action='store_true',
+                        default=bool(os.environ.get('CONVICTION_HEADLESS')),
+                        help="don't open a browser (also set by CONVICTION_HEADLESS=1)")
+    args = parser.parse_args(argv)
+    
     print("🎮 Conviction 2040 - Web Visualization Demo")
     print()
     
     # Check if required files exist
     required_files = ['conviction_abstract_map.html', 'models.py', 'conviction.py']
-    missing_files = []
-    
-    for file in required_files:
-        try:
-            with open(file, 'r'):
-                pass
-        except FileNotFoundError:
-            missing_files.append(file)
+    missing_files = [file for file in required_files if not isfile(file)]
     
     if missing_files:
         print("❌ Missing required files:")
@@ -265,9 +352,12 @@ def main():
     print()
     
     # Run the demo
-    demo = ConvictionDemo()
+    # Pausing only makes sense when someone is at the terminal
+    demo = ConvictionDemo(interactive=not args.no_wait and sys.stdin.isatty(),
+                          headless=args.headless)
     
     try:
+        install_uvloop()
         asyncio.run(demo.start_demo())
     except KeyboardInterrupt:
         print("\n👋 Demo stopped by user")
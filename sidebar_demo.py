@@ -24,7 +24,7 @@ players assigned to different blocs with their respective themed panels.
 
 import asyncio
 import logging
-from web_bridge import ConvictionWebBridge
+from web_bridge import ConvictionWebBridge, install_uvloop
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -74,6 +74,7 @@ async def run_sidebar_demo():
         print(f"\n❌ Error: {e}")
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(run_sidebar_demo())
     except KeyboardInterrupt:
@@ -5,9 +5,10 @@ This simulates what happens when players interact with the web interface.
 """
 
 import asyncio
-import json
 import websockets
 from game_with_controls import ConvictionGameWithControls
+from test_utils import dumps, recv
+from web_bridge import install_uvloop
 
 
 async def test_player_interaction():
@@ -42,14 +43,6 @@ async def test_player_interaction():
                 "card": "CYBER_ESPIONAGE"
             }
             
-            print("\n🇺🇸 USA submitting turn...")
-            await websocket.send(json.dumps(usa_turn))
-            
-            # Wait for confirmation
-            response = await websocket.recv()
-            response_data = json.loads(response)
-            print(f"   Server response: {response_data}")
-            
             # Simulate EU player submitting a turn
             eu_turn = {
                 "action": "submit_turn",
@@ -64,13 +57,6 @@ async def test_player_interaction():
                 "card": "TRADE_DEAL"
             }
             
-            print("\n🇪🇺 EU submitting turn...")
-            await websocket.send(json.dumps(eu_turn))
-            
-            response = await websocket.recv()
-            response_data = json.loads(response)
-            print(f"   Server response: {response_data}")
-            
             # Simulate China player submitting a turn
             china_turn = {
                 "action": "submit_turn",
@@ -85,15 +71,20 @@ async def test_player_interaction():
                 "card": "PROXY_ARMS"
             }
             
-            print("\n🇨🇳 China submitting turn...")
-            await websocket.send(json.dumps(china_turn))
+            # The blocs are independent, so send all three turns back to back
+            print("\n🌐 USA, EU and China submitting turns...")
+            turns = [usa_turn, eu_turn, china_turn]
+            await asyncio.gather(*(websocket.send(dumps(turn)) for turn in turns))
             
-            response = await websocket.recv()
-            response_data = json.loads(response)
-            print(f"   Server response: {response_data}")
+            # Then collect the confirmations; websockets allows only one
+            # recv() at a time, so these are read in order
+            for _ in turns:
+                response_data = await recv(websocket)
+                print(f"   Server response: {response_data}")
             
             print("\n⏳ Waiting for turn processing...")
-            await asyncio.sleep(8)  # Wait for turn processing
+            while (await asyncio.wait_for(recv(websocket), timeout=15)).get('type') != 'turn_processed':
+                pass
             
             print("✅ Turn processing completed!")
             print("\n💡 The game is working! Players can:")
@@ -113,6 +104,7 @@ async def test_player_interaction():
 
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(test_player_interaction())
     except KeyboardInterrupt:
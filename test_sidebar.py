@@ -7,24 +7,61 @@ This script tests the sidebar implementation to ensure all features work correct
 """
 
 import asyncio
-import json
-import websockets
-import requests
-import time
+import contextlib
+import io
+import sys
+import aiohttp
 from typing import Dict, Any
+from test_utils import dumps, recv
+from web_bridge import install_uvloop
+
+try:
+    # websockets 13+: the new asyncio implementation, with its C speedups
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:
+    from websockets import connect as ws_connect
+
+try:
+    from asyncio import timeout as _timeout  # Python 3.11+
+except ImportError:
+    from async_timeout import timeout as _timeout  # installed with aiohttp
 
 class SidebarTester:
     """Test the sidebar player panel functionality."""
     
+    REQUIRED_ELEMENTS = [
+        'id="playerPanel"',           # Main sidebar panel
+        'class="panel-header"',       # Draggable header
+        'minimize-btn',               # Minimize button (part of class)
+        'close-btn',                  # Close button (part of class)
+        'id="militarySlider"',        # Budget sliders
+        'id="actionCard"',            # Action card selector
+        'id="submitTurn"'             # Submit button
+    ]
+    
     def __init__(self, base_url="http://localhost:8080"):
         self.base_url = base_url
         self.ws_url = base_url.replace("http://", "ws://") + "/ws"
-        self.test_results = []
+        # One byte per test (1 = pass); names and details kept for failures only
+        self._passed = bytearray()
+        self._failures = []
+        self._html = None
+        self.session = None
+        self.ws = None
+    
+    async def _get_html(self):
+        """Page HTML as bytes, fetched at most once per run."""
+        if self._html is None:
+            async with self.session.get(self.base_url) as response:
+                self._html = await response.read()
+        return self._html
     
     def log_test(self, test_name: str, passed: bool, details: str = ""):
         """Log a test result."""
         status = "✅ PASS" if passed else "❌ FAIL"
-        self.test_results.append((test_name, passed, details))
+        self._passed.append(1 if passed else 0)
+        if not passed:
+            self._failures.append((test_name, details))
         print(f"{status} {test_name}")
         if details:
             print(f"     {details}")
@@ -32,8 +69,11 @@ class SidebarTester:
     async def test_server_running(self):
         """Test if the server is running and accessible."""
         try:
-            response = requests.get(self.base_url, timeout=5)
-            self.log_test("Server Running", response.status_code == 200)
+            async with self.session.get(self.base_url) as response:
+                ok = response.status == 200
+                if ok:
+                    self._html = await response.read()
+            self.log_test("Server Running", ok)
             return True
         except Exception as e:
             self.log_test("Server Running", False, f"Error: {e}")
@@ -42,48 +82,51 @@ class SidebarTester:
     async def test_websocket_connection(self):
         """Test WebSocket connection establishment."""
         try:
-            async with websockets.connect(self.ws_url) as ws:
-                self.log_test("WebSocket Connection", True)
-                return ws
+            # Kept open for the tests that don't need a distinct client
+            self.ws = await ws_connect(self.ws_url)
+            self.log_test("WebSocket Connection", True)
+            return self.ws
         except Exception as e:
             self.log_test("WebSocket Connection", False, f"Error: {e}")
             return None
     
-    async def test_player_bloc_assignment(self):
-        """Test player bloc assignment functionality."""
-        assignments = []
-        
-        for i in range(3):  # Test 3 connections for USA, EU, China
-            try:
-                # Add a small delay to ensure distinct connections
-                if i > 0:
-                    await asyncio.sleep(0.1)
-                    
-                async with websockets.connect(self.ws_url) as ws:
-                    # Send bloc assignment request
-                    await ws.send(json.dumps({"type": "get_player_bloc"}))
+    async def _one_assignment(self, i: int):
+        """Request a bloc on a fresh connection; returns the bloc or None."""
+        async with ws_connect(self.ws_url) as ws:
+            # Send bloc assignment request
+            await ws.send(dumps({"type": "get_player_bloc"}))
+            
+            # Wait for multiple messages - first might be game state
+            messages_received = 0
+            while messages_received < 3:  # Try to get up to 3 messages
+                try:
+                    async with _timeout(2):
+                        data = await recv(ws)
+                    messages_received += 1
+                    message_type = data.get("type")
                     
-                    # Wait for multiple messages - first might be game state
-                    messages_received = 0
-                    while messages_received < 3:  # Try to get up to 3 messages
-                        try:
-                            response = await asyncio.wait_for(ws.recv(), timeout=2)
-                            data = json.loads(response)
-                            messages_received += 1
-                            
-                            print(f"  Connection {i+1} message {messages_received}: {data.get('type', 'unknown')}")
-                            
-                            if data.get("type") == "player_bloc":
-                                assignments.append(data.get("bloc"))
-                                print(f"    → Assigned to: {data.get('bloc')}")
-                                break
-                        except asyncio.TimeoutError:
-                            break  # No more messages
+                    print(f"  Connection {i+1} message {messages_received}: {message_type or 'unknown'}")
                     
-                    await asyncio.sleep(0.2)  # Longer delay to ensure connection cleanup
-            except Exception as e:
-                self.log_test(f"Player Assignment {i+1}", False, f"Error: {e}")
+                    if message_type == "player_bloc":
+                        bloc = data.get("bloc")
+                        print(f"    → Assigned to: {bloc}")
+                        return bloc
+                except asyncio.TimeoutError:
+                    break  # No more messages
+        return None
+    
+    async def test_player_bloc_assignment(self):
+        """Test player bloc assignment functionality."""
+        # Test 3 connections for USA, EU, China; each is its own socket, so
+        # they can all be assigned at once
+        results = await asyncio.gather(
+            *(self._one_assignment(i) for i in range(3)), return_exceptions=True
+        )
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                self.log_test(f"Player Assignment {i+1}", False, f"Error: {result}")
                 return
+        assignments = [bloc for bloc in results if bloc is not None]
         
         expected_blocs = set(["USA", "EU", "China"])
         received_blocs = set(assignments)
@@ -95,80 +138,72 @@ class SidebarTester:
     async def test_turn_submission(self):
         """Test turn submission functionality."""
         try:
-            async with websockets.connect(self.ws_url) as ws:
-                # Get player assignment first
-                await ws.send(json.dumps({"type": "get_player_bloc"}))
-                
-                # Wait for messages and find the player_bloc response
-                assignment_data = None
-                messages_received = 0
-                while messages_received < 3:
-                    try:
-                        response = await asyncio.wait_for(ws.recv(), timeout=3)
-                        data = json.loads(response)
-                        messages_received += 1
-                        
-                        if data.get("type") == "player_bloc":
-                            assignment_data = data
-                            break
-                    except asyncio.TimeoutError:
+            if self.ws is None:
+                self.ws = await ws_connect(self.ws_url)
+            ws = self.ws
+            
+            # Get player assignment first
+            await ws.send(dumps({"type": "get_player_bloc"}))
+            
+            # Wait for messages and find the player_bloc response
+            assignment_data = None
+            player_bloc = None
+            messages_received = 0
+            while messages_received < 3:
+                try:
+                    async with _timeout(3):
+                        data = await recv(ws)
+                    messages_received += 1
+                    
+                    if data.get("type") == "player_bloc":
+                        assignment_data = data
+                        player_bloc = data.get("bloc")
                         break
-                
-                if not assignment_data or assignment_data.get("type") != "player_bloc":
-                    self.log_test("Turn Submission Setup", False, f"No bloc assignment: {assignment_data}")
-                    return
-                
-                player_bloc = assignment_data.get("bloc")
-                print(f"  Testing turn submission for bloc: {player_bloc}")
-                
-                # Submit a test turn
-                turn_data = {
-                    "action": "submit_turn",
-                    "bloc": player_bloc,
-                    "budget": {
-                        "military": 20,
-                        "tech": 15,
-                        "culture": 10,
-                        "infra": 25,
-                        "diplomacy": 30
-                    },
-                    "card": "Economic Development"
-                }
-                
-                await ws.send(json.dumps(turn_data))
-                
-                # Wait for confirmation
-                response = await asyncio.wait_for(ws.recv(), timeout=5)
-                confirmation = json.loads(response)
-                
-                success = (confirmation.get("type") == "turn_submitted" and 
-                          confirmation.get("accepted") is True)
-                self.log_test("Turn Submission", success, 
-                             f"Bloc: {player_bloc}, Confirmation: {confirmation}")
-                
+                except asyncio.TimeoutError:
+                    break
+            
+            # assignment_data is only set by a player_bloc message
+            if not assignment_data:
+                self.log_test("Turn Submission Setup", False, f"No bloc assignment: {assignment_data}")
+                return
+            
+            print(f"  Testing turn submission for bloc: {player_bloc}")
+            
+            # Submit a test turn
+            turn_data = {
+                "action": "submit_turn",
+                "bloc": player_bloc,
+                "budget": {
+                    "military": 20,
+                    "tech": 15,
+                    "culture": 10,
+                    "infra": 25,
+                    "diplomacy": 30
+                },
+                "card": "Economic Development"
+            }
+            
+            await ws.send(dumps(turn_data))
+            
+            # Wait for confirmation
+            async with _timeout(5):
+                confirmation = await recv(ws)
+            
+            success = (confirmation.get("type") == "turn_submitted" and 
+                      confirmation.get("accepted") is True)
+            self.log_test("Turn Submission", success, 
+                         f"Bloc: {player_bloc}, Confirmation: {confirmation}")
+            
         except Exception as e:
             self.log_test("Turn Submission", False, f"Error: {e}")
     
     async def test_html_content(self):
         """Test that the HTML contains required sidebar elements."""
         try:
-            response = requests.get(self.base_url, timeout=5)
-            html_content = response.text
-            
-            required_elements = [
-                'id="playerPanel"',           # Main sidebar panel
-                'class="panel-header"',       # Draggable header
-                'minimize-btn',               # Minimize button (part of class)
-                'close-btn',                  # Close button (part of class)
-                'id="militarySlider"',        # Budget sliders
-                'id="actionCard"',            # Action card selector
-                'id="submitTurn"'             # Submit button
-            ]
+            html_content = await self._get_html()
             
-            missing_elements = []
-            for element in required_elements:
-                if element not in html_content:
-                    missing_elements.append(element)
+            # The page is raw bytes; the markers are ASCII, so encode them instead
+            missing_elements = [e for e in self.REQUIRED_ELEMENTS if e.encode() not in html_content]
             
             success = len(missing_elements) == 0
             details = f"Missing: {missing_elements}" if missing_elements else "All elements found"
@@ -177,34 +212,50 @@ class SidebarTester:
         except Exception as e:
             self.log_test("HTML Sidebar Elements", False, f"Error: {e}")
     
+    async def _run(self, test):
+        """Run one test with its output buffered and written in one go."""
+        report = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(report):
+                return await test()
+        finally:
+            sys.stdout.write(report.getvalue())
+            sys.stdout.flush()
+    
     async def run_all_tests(self):
         """Run all tests."""
-        print("🧪 Testing Sidebar Player Panel Implementation")
-        print("=" * 50)
+        print("🧪 Testing Sidebar Player Panel Implementation\n" + "=" * 50)
         
-        # Test server availability
-        if not await self.test_server_running():
-            print("⚠️  Server not running. Please start with: python web_bridge.py")
-            return
-        
-        # Run all tests
-        await self.test_html_content()
-        await self.test_websocket_connection()
-        await self.test_player_bloc_assignment()
-        await self.test_turn_submission()
+        # One keep-alive session serves both page requests
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        try:
+            # Test server availability
+            if not await self._run(self.test_server_running):
+                print("⚠️  Server not running. Please start with: python web_bridge.py")
+                return
+            
+            # Run all tests
+            await self._run(self.test_html_content)
+            await self._run(self.test_websocket_connection)
+            await self._run(self.test_player_bloc_assignment)
+            await self._run(self.test_turn_submission)
+        finally:
+            if self.ws is not None:
+                await self.ws.close()
+            await self.session.close()
         
         # Summary
-        print("\n📊 Test Summary")
-        print("-" * 30)
-        passed = sum(1 for _, result, _ in self.test_results if result)
-        total = len(self.test_results)
-        
-        print(f"Tests Passed: {passed}/{total}")
+        passed = sum(self._passed)
+        total = len(self._passed)
         
+        summary = ["\n📊 Test Summary", "-" * 30, f"Tests Passed: {passed}/{total}"]
         if passed == total:
-            print("🎉 All tests passed! Sidebar implementation is working correctly.")
+            summary.append("🎉 All tests passed! Sidebar implementation is working correctly.")
         else:
-            print("⚠️  Some tests failed. Check the details above.")
+            summary.append("⚠️  Some tests failed:")
+            summary.extend(f"  ❌ {name}: {details}" if details else f"  ❌ {name}"
+                           for name, details in self._failures)
+        print("\n".join(summary))
             
         return passed == total
 
@@ -215,7 +266,7 @@ async def main():
     return 0 if success else 1
 
 if __name__ == "__main__":
-    import sys
+    install_uvloop()
     try:
         result = asyncio.run(main())
         sys.exit(result)
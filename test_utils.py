@@ -0,0 +1,36 @@
+# test_utils.py - Helpers shared by the WebSocket client test scripts
+"""
+The bridge merges bursts of messages into 'batch' frames (possibly nested).
+recv() hands them back one at a time, in send order.
+"""
+
+import collections
+import weakref
+
+try:
+    import orjson
+    # The bridge accepts binary frames, so orjson's UTF-8 bytes go out as-is
+    dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    from json import dumps, loads as _loads
+
+# Messages already received per connection but not yet handed out
+_unread = weakref.WeakKeyDictionary()
+
+
+def unbatch(message):
+    """Yield message, or each message inside it if it is a 'batch' frame."""
+    if message.get("type") == "batch":
+        for item in message["data"]:
+            yield from unbatch(item)
+    else:
+        yield message
+
+
+async def recv(ws):
+    """Next message from ws, unpacking any batch frames."""
+    pending = _unread.setdefault(ws, collections.deque())
+    while not pending:
+        pending.extend(unbatch(_loads(await ws.recv())))
+    return pending.popleft()
@@ -4,9 +4,21 @@ Simple test to verify that the Conviction web visualization system is working co
 """
 
 import asyncio
+import functools
+import json
+import mmap
 import sys
 import os
 
+
+@functools.lru_cache(maxsize=1)
+def _make_game():
+    """Build the demo game once; the tests below only read it or wrap it in a bridge."""
+    from conviction import ConvictionGame
+    game = ConvictionGame()
+    game.create_simple_map()
+    return game
+
 def test_imports():
     """Test that all required modules can be imported."""
     print("🧪 Testing imports...")
@@ -18,13 +30,6 @@ def test_imports():
         print(f"  ❌ Failed to import aiohttp: {e}")
         return False
     
-    try:
-        import aiohttp_cors
-        print("  ✅ aiohttp_cors imported successfully")
-    except ImportError as e:
-        print(f"  ❌ Failed to import aiohttp_cors: {e}")
-        return False
-    
     try:
         from models import Bloc, ProxyRegion
         print("  ✅ models imported successfully")
@@ -61,9 +66,13 @@ def test_file_existence():
         'requirements.txt'
     ]
     
+    # One directory listing instead of a stat() per file
+    with os.scandir('.') as entries:
+        present = {entry.name for entry in entries}
+    
     all_exist = True
     for file in required_files:
-        if os.path.exists(file):
+        if file in present:
             print(f"  ✅ {file} exists")
         else:
             print(f"  ❌ {file} missing")
@@ -76,9 +85,7 @@ def test_game_creation():
     print("\n🎮 Testing game creation...")
     
     try:
-        from conviction import ConvictionGame
-        game = ConvictionGame()
-        game.create_simple_map()
+        game = _make_game()
         print("  ✅ ConvictionGame created and initialized")
         
         # Test basic game properties
@@ -98,13 +105,9 @@ def test_web_bridge_creation():
     print("\n🌐 Testing web bridge creation...")
     
     try:
-        from conviction import ConvictionGame
         from web_bridge import ConvictionWebBridge
         
-        game = ConvictionGame()
-        game.create_simple_map()
-        
-        bridge = ConvictionWebBridge(game)
+        bridge = ConvictionWebBridge(_make_game())
         print("  ✅ ConvictionWebBridge created successfully")
         
         # Test serialization
@@ -123,13 +126,9 @@ async def test_server_startup():
     print("\n🚀 Testing server startup...")
     
     try:
-        from conviction import ConvictionGame
         from web_bridge import ConvictionWebBridge
         
-        game = ConvictionGame()
-        game.create_simple_map()
-        
-        bridge = ConvictionWebBridge(game)
+        bridge = ConvictionWebBridge(_make_game())
         
         # Start server on different port to avoid conflicts
         runner = await bridge.run(host='localhost', port=8081)
@@ -144,23 +143,186 @@ async def test_server_startup():
         print(f"  ❌ Failed to start server: {e}")
         return False
 
+def test_state_cache():
+    """Test that the cached state follows game changes without manual invalidation."""
+    print("\n🗄️ Testing state cache...")
+    
+    try:
+        from conviction import ConvictionGame
+        from web_bridge import ConvictionWebBridge
+        
+        game = ConvictionGame()
+        game.create_simple_map()
+        bridge = ConvictionWebBridge(game)
+        state = bridge.serialize_game_state()
+        assert bridge.serialize_game_state() is state, "Unchanged state should come from the cache"
+        print("  ✅ Unchanged state is served from the cache")
+        
+        game.provinces['North'].controller = 'Blue'
+        game.powers['Red'].gdp_tokens = 99
+        game.turn += 1
+        state = bridge.serialize_game_state()
+        assert state['regions'][0]['owner'] == 'Blue', "Controller change not picked up"
+        assert state['blocs'][0]['gdp_tokens'] == 99, "Bloc change not picked up"
+        assert state['turn'] == game.turn, "Turn change not picked up"
+        print("  ✅ Model and turn changes invalidate the cache by themselves")
+        
+        version = bridge._state_version
+        game.powers['Red'].gdp_tokens = 99
+        assert bridge.serialize_game_state() is state, "No-op assignment should keep the cached state"
+        assert bridge._state_version == version, "No-op assignment should keep the version"
+        print("  ✅ Assignments that change nothing keep the version")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ State cache check failed: {e!r}")
+        return False
+
+def test_json_encoding():
+    """Test that orjson and the stdlib fallback put the same bytes on the wire."""
+    print("\n🔤 Testing message encoding...")
+    
+    try:
+        import web_bridge
+        from models import CardType, Province
+        
+        message = {
+            'card': CardType.PROXY_ARMS,
+            'cards': [CardType.TRADE_DEAL, (1, CardType.COUNTER_INTEL)],
+            'province': Province('Nörth', controller='Red'),
+            'state': {'turn': 1, 'regions': []},
+        }
+        saved = web_bridge.orjson
+        web_bridge.orjson = None
+        try:
+            fallback = web_bridge._dumps(message)
+        finally:
+            web_bridge.orjson = saved
+        
+        assert b'"card":"PROXY_ARMS"' in fallback, f"Enums should go out by name: {fallback!r}"
+        print("  ✅ Enums are encoded by name")
+        
+        if saved is None:
+            print("  ⚠️ orjson not installed; only the stdlib encoder was checked")
+        else:
+            encoded = web_bridge._dumps(message)
+            assert encoded == fallback, f"orjson {encoded!r} != stdlib {fallback!r}"
+            print("  ✅ orjson and stdlib json produce identical bytes")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ Encoding check failed: {e!r}")
+        return False
+
+async def test_state_patch():
+    """Test the JSON Patch diff and the versioning clients resync with."""
+    print("\n🩹 Testing state patches...")
+    
+    try:
+        from aiohttp.test_utils import TestClient, TestServer
+        from conviction import ConvictionGame
+        from test_utils import unbatch
+        from web_bridge import ConvictionWebBridge, _json_diff
+        
+        # Nested dicts: removed, added and changed keys
+        ops = _json_diff({'a': {'x': 1, 'y': 2}, 'b': 1}, {'a': {'x': 1, 'z': 3}, 'b': 2})
+        assert ops == [
+            {'op': 'remove', 'path': '/a/y'},
+            {'op': 'add', 'path': '/a/z', 'value': 3},
+            {'op': 'replace', 'path': '/b', 'value': 2},
+        ], f"Unexpected dict diff: {ops}"
+        assert _json_diff({'a/b': 1}, {'a/b': 2}) == [{'op': 'replace', 'path': '/a~1b', 'value': 2}]
+        print("  ✅ Nested dict add/remove/replace")
+        
+        # Lists changing length: append at the end, remove from the end backwards
+        assert _json_diff([1, 2], [1, 5, 3, 4]) == [
+            {'op': 'replace', 'path': '/1', 'value': 5},
+            {'op': 'add', 'path': '/2', 'value': 3},
+            {'op': 'add', 'path': '/3', 'value': 4},
+        ]
+        assert _json_diff({'l': [1, 2, 3]}, {'l': [1]}) == [
+            {'op': 'remove', 'path': '/l/2'},
+            {'op': 'remove', 'path': '/l/1'},
+        ]
+        assert _json_diff([1, 2], [1, 2]) == []
+        print("  ✅ List length changes")
+        
+        game = ConvictionGame()
+        game.create_simple_map()
+        bridge = ConvictionWebBridge(game)
+        first = bridge.state_delta()
+        assert first['from'] == -1, "First delta should apply to an empty state"
+        assert bridge.state_delta() is None, "No delta expected without a change"
+        
+        game.provinces['North'].controller = 'Blue'
+        second = bridge.state_delta()
+        assert second['from'] == first['version'], "Deltas should chain by version"
+        assert second['ops'] == [{'op': 'replace', 'path': '/regions/0/owner', 'value': 'Blue'}]
+        print("  ✅ Deltas chain from one version to the next")
+        
+        # A client that missed a delta asks for the state again; the full
+        # state's version is the one the next delta applies to
+        async with TestClient(TestServer(bridge.app)) as client:
+            ws = await client.ws_connect('/ws')
+            await ws.send_json({'type': 'get_state'})
+            # The bridge sends binary frames and may batch the two replies
+            messages = []
+            while len(messages) < 2:
+                messages.extend(unbatch(json.loads(await ws.receive_bytes())))
+            await ws.close()
+        resync = messages[1]  # messages[0] is the full state sent on connect
+        assert resync['type'] == 'full_state', f"Expected full_state, got {resync['type']}"
+        assert resync['version'] == second['version'], "Full state should carry its version"
+        
+        game.provinces['North'].controller = 'Red'
+        assert bridge.state_delta()['from'] == resync['version']
+        print("  ✅ Resync with get_state picks up the delta chain")
+        
+        # A change no delta has gone out for yet: the client joining now must
+        # still be able to apply the next delta to the state it was sent
+        game.provinces['North'].controller = 'Blue'
+        async with TestClient(TestServer(bridge.app)) as client:
+            ws = await client.ws_connect('/ws')
+            joined = next(unbatch(json.loads(await ws.receive_bytes())))
+            await ws.close()
+        assert joined['type'] == 'full_state', f"Expected full_state, got {joined['type']}"
+        game.provinces['North'].controller = 'Red'
+        assert bridge.state_delta()['from'] == joined['version'], \
+            "Next delta should apply to the state sent on connect"
+        print("  ✅ Clients joining between deltas can apply the next one")
+        
+        # The previous snapshot must not share lists with the live blocs;
+        # in-place list edits are not tracked, so flag this one by hand
+        game.powers['Red'].satellites.append('East')
+        bridge.invalidate_state_cache()
+        ops = bridge.state_delta()['ops']
+        assert {'op': 'add', 'path': '/blocs/0/satellites/0', 'value': 'East'} in ops, \
+            f"Satellite change missing from patch: {ops}"
+        print("  ✅ Satellite changes show up in the patch")
+        
+        return True
+    except Exception as e:
+        print(f"  ❌ State patch check failed: {e!r}")
+        return False
+
 def test_html_file():
     """Test that the HTML visualization file is valid."""
     print("\n🎨 Testing HTML visualization file...")
     
     try:
-        with open('conviction_abstract_map.html', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Basic HTML structure checks
-        assert '<!DOCTYPE html>' in content, "HTML should have DOCTYPE"
-        assert '<html' in content, "HTML should have html tag"
-        assert '<canvas' in content, "HTML should have canvas element"
-        assert 'CONVICTION' in content, "HTML should contain game title"
-        assert 'WebSocket' in content, "HTML should have WebSocket code"
+        # Search the mapped file directly instead of reading it into a str
+        with open('conviction_abstract_map.html', 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            # Basic HTML structure checks
+            assert content.find(b'<!DOCTYPE html>') != -1, "HTML should have DOCTYPE"
+            assert content.find(b'<html') != -1, "HTML should have html tag"
+            assert content.find(b'<canvas') != -1, "HTML should have canvas element"
+            assert content.find(b'CONVICTION') != -1, "HTML should contain game title"
+            assert content.find(b'WebSocket') != -1, "HTML should have WebSocket code"
+            size = len(content)
         
         print("  ✅ HTML file has correct structure")
-        print(f"  ✅ HTML file size: {len(content):,} characters")
+        print(f"  ✅ HTML file size: {size:,} bytes")
         
         return True
     except Exception as e:
@@ -179,6 +341,9 @@ async def run_all_tests():
         ("Web Bridge Test", test_web_bridge_creation),
         ("HTML Validation Test", test_html_file),
         ("Server Startup Test", test_server_startup),
+        ("State Cache Test", test_state_cache),
+        ("State Patch Test", test_state_patch),
+        ("Encoding Test", test_json_encoding),
     ]
     
     passed = 0
@@ -219,6 +384,13 @@ async def run_all_tests():
     return passed == total
 
 if __name__ == '__main__':
+    try:
+        # Faster event loop when available; a missing dependency is left
+        # for test_imports to report
+        from web_bridge import install_uvloop
+        install_uvloop()
+    except ImportError:
+        pass
     try:
         success = asyncio.run(run_all_tests())
         sys.exit(0 if success else 1)
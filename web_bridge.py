@@ -1,23 +1,187 @@
 # web_bridge.py - WebSocket bridge for real-time Conviction game visualization
 import asyncio
+import functools
 import json
 import logging
-from typing import Dict, List, Optional
-from aiohttp import web, WSMsgType
-import aiohttp_cors
-from models import Bloc, ProxyRegion
+import os
+import signal
+import time
+import zlib
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple, Union
+from aiohttp import web, WSCloseCode, WSMsgType
+from models import Bloc, Province, mutation_count
 from conviction import ConvictionGame
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json produces the same frames
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional; only needed by clients connecting with ?fmt=msgpack
+    msgpack = None
+
+# Seconds to wait on a single client before treating it as disconnected
+SEND_TIMEOUT = 5.0
+# Outbound messages buffered per client before the oldest are dropped
+SEND_QUEUE_SIZE = 256
+# Clients enqueued per event-loop turn during a broadcast
+BROADCAST_BATCH = 50
+# The visualization page served at / and /map
+MAP_FILE = 'conviction_abstract_map.html'
+
+def _json_default(obj):
+    """Encode values json can't handle natively; enums go out by name."""
+    if isinstance(obj, Enum):
+        return obj.name
+    if hasattr(obj, 'to_dict'):
+        # Model objects (Bloc, Province) can go into messages as-is
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _enum_names(obj):
+    """obj with any Enum members replaced by their names.
+    
+    Containers without enums are returned as-is rather than copied, so
+    cached state dicts cost only a walk.
+    """
+    if isinstance(obj, Enum):
+        return obj.name
+    if isinstance(obj, dict):
+        items = obj.items()
+    elif isinstance(obj, (list, tuple)):
+        items = enumerate(obj)
+    else:
+        return obj
+    
+    copy = None
+    for key, value in items:
+        converted = _enum_names(value)
+        if converted is not value:
+            if copy is None:
+                copy = dict(obj) if isinstance(obj, dict) else list(obj)
+            copy[key] = converted
+    return obj if copy is None else copy
+
+
+def _dumps(message) -> bytes:
+    """Encode an outbound message as compact UTF-8 JSON bytes.
+    
+    orjson and the stdlib fallback produce the same bytes for the same message.
+    """
+    if orjson is not None:
+        # orjson encodes enums natively by value, before default= is tried,
+        # so swap them for names first. Dataclasses go through _json_default
+        # too, so models use their to_dict()
+        return orjson.dumps(_enum_names(message), default=_json_default,
+                            option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(message, default=_json_default, ensure_ascii=False,
+                      separators=(',', ':')).encode()
+
+
+def _loads(data: Union[str, bytes]):
+    """Decode an inbound JSON message from a text or binary frame."""
+    if orjson is not None:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _envelope_prefix(update_type: str) -> bytes:
+    """Encoded start of a {'type': update_type, 'data': ...} message."""
+    return b'{"type":' + _dumps(update_type) + b',"data":'
+
+
+def _json_response(data, status: int = 200) -> web.Response:
+    """web.json_response() with the module's encoder; sends the bytes as-is."""
+    return web.Response(body=_dumps(data), status=status,
+                        content_type='application/json', charset='utf-8')
+
+
+@web.middleware
+async def _cors_middleware(request: web.Request, handler):
+    """Allow any origin, with credentials and all headers exposed, on every route."""
+    origin = request.headers.get('Origin')
+    if origin is None:
+        return await handler(request)
+    
+    if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+        # Preflight: grant whatever method and headers were asked for
+        response = web.Response()
+        response.headers['Access-Control-Allow-Methods'] = request.headers['Access-Control-Request-Method']
+        if 'Access-Control-Request-Headers' in request.headers:
+            response.headers['Access-Control-Allow-Headers'] = request.headers['Access-Control-Request-Headers']
+    else:
+        try:
+            response = await handler(request)
+        except web.HTTPException as exc:
+            # Raised responses (e.g. 404 for an unknown route) need the headers too
+            _add_cors_headers(exc, origin)
+            raise
+        if response.prepared:
+            return response  # WebSocket upgrades have already sent their headers
+    
+    _add_cors_headers(response, origin)
+    return response
+
+
+def _add_cors_headers(response: web.StreamResponse, origin: str):
+    """Set the CORS response headers for a request from origin."""
+    # Credentials rule out the '*' wildcard, so echo the caller's origin
+    response.headers['Access-Control-Allow-Origin'] = origin
+    response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response.headers['Access-Control-Expose-Headers'] = '*'
+    response.headers.add('Vary', 'Origin')
+
+
+@functools.lru_cache(maxsize=32)
+def _msgpack_frame(payload: bytes) -> bytes:
+    """Re-encode a JSON payload as MessagePack, once per payload across a fan-out."""
+    return msgpack.packb(_loads(payload), use_bin_type=True)
+
+
 class ConvictionWebBridge:
     """WebSocket bridge that connects the Conviction game to the web visualization."""
     
-    def __init__(self, game: Optional['ConvictionGame'] = None):
+    def __init__(self, game: Optional['ConvictionGame'] = None,
+                 compress: bool = False):
         self.game = game
-        self.websockets: List[web.WebSocketResponse] = []
-        self.app = web.Application()
+        # permessage-deflate costs a zlib pass per client per frame; state
+        # frames are small, so it is off unless compress=True is passed
+        self.compress = compress
+        self.websockets: Set[web.WebSocketResponse] = set()
+        # Outbound queue per client, drained by that client's writer task
+        self._queues: Dict[web.WebSocketResponse, asyncio.Queue] = {}
+        # Bumped by _sync_state_version() when the game is seen to have
+        # changed, or by invalidate_state_cache(); the caches below are
+        # reused while their version still matches
+        self._state_version = 0
+        # The _game_key() the current state version was taken at
+        self._seen_game: Optional[Tuple] = None
+        self._state_cache: Tuple[Optional[Dict], int] = (None, -1)
+        self._state_payload_cache: Tuple[Optional[bytes], int] = (None, -1)
+        # Position of each region in the cached state's 'regions' list
+        self._region_index: Dict[str, int] = {}
+        self._full_state_payload_cache: Tuple[Optional[bytes], int] = (None, -1)
+        # Snapshot the last state_patch() was computed against
+        self._last_state: Dict = {}
+        self._patch_version = -1
+        # Messages held back while a batch is open (see start_batch)
+        self._pending_events: Optional[List[Dict]] = None
+        # Player session state: this turn's submissions by bloc, the
+        # round-robin bloc assignment count and the setup screen's options
+        self.turn_submissions: Dict[str, Dict] = {}
+        self.assignment_counter = 0
+        self.game_config: Dict = {}
+        self.app = web.Application(middlewares=[_cors_middleware])
+        self.app.on_shutdown.append(self._close_websockets)
         self.setup_routes()
         
     def setup_routes(self):
@@ -32,56 +196,71 @@ class ConvictionWebBridge:
         # API endpoints for game state
         self.app.router.add_get('/api/state', self.get_game_state)
         self.app.router.add_post('/api/action', self.handle_action)
-        
-        # Enable CORS for all routes
-        cors = aiohttp_cors.setup(self.app, defaults={
-            "*": aiohttp_cors.ResourceOptions(
-                allow_credentials=True,
-                expose_headers="*",
-                allow_headers="*",
-                allow_methods="*"
-            )
-        })
-        
-        for route in list(self.app.router.routes()):
-            cors.add(route)
+        # CORS headers for all routes come from _cors_middleware
     
     async def serve_map(self, request):
         """Serve the HTML map visualization."""
-        try:
-            with open('conviction_abstract_map.html', 'r', encoding='utf-8') as f:
-                content = f.read()
-            return web.Response(text=content, content_type='text/html')
-        except FileNotFoundError:
+        if not os.path.isfile(MAP_FILE):
             return web.Response(text="Map file not found", status=404)
+        
+        # FileResponse sends with sendfile(2) where available and handles
+        # ETag / Last-Modified revalidation itself; edits show up immediately
+        return web.FileResponse(MAP_FILE, headers={'Cache-Control': 'public, max-age=60'})
     
     async def websocket_handler(self, request):
         """Handle WebSocket connections for real-time updates."""
-        ws = web.WebSocketResponse()
+        # Clients opt into MessagePack frames with /ws?fmt=msgpack
+        use_msgpack = request.query.get('fmt') == 'msgpack'
+        if use_msgpack and msgpack is None:
+            return web.Response(text="msgpack is not installed on the server", status=400)
+        
+        # Clients can override the server default with ?compress=1 / ?compress=0,
+        # e.g. to turn deflate on for a slow link. MessagePack frames are
+        # already compact, so skip deflate for them.
+        compress = self.compress
+        if 'compress' in request.query:
+            compress = request.query['compress'] == '1'
+        ws = web.WebSocketResponse(compress=False if use_msgpack else compress)
         await ws.prepare(request)
         
-        self.websockets.append(ws)
-        logger.info(f"New WebSocket connection. Total: {len(self.websockets)}")
+        # All sends to this client go through its queue and writer task
+        queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._queues[ws] = queue
+        writer = asyncio.create_task(
+            self._writer(ws, queue, _msgpack_frame if use_msgpack else None)
+        )
         
-        # Send initial game state
+        # Send initial game state before joining the broadcast set, so the
+        # delta send_game_state() flushes to the others skips this client
         if self.game:
             await self.send_game_state(ws)
         
+        self.websockets.add(ws)
+        logger.info(f"New WebSocket connection. Total: {len(self.websockets)}")
+        
         try:
             async for msg in ws:
-                if msg.type == WSMsgType.TEXT:
+                # Clients may send JSON as UTF-8 bytes in a binary frame;
+                # msgpack clients send MessagePack in binary frames instead
+                if msg.type in (WSMsgType.TEXT, WSMsgType.BINARY):
                     try:
-                        data = json.loads(msg.data)
-                        await self.handle_websocket_message(ws, data)
-                    except json.JSONDecodeError:
-                        logger.error(f"Invalid JSON received: {msg.data}")
+                        if use_msgpack and msg.type == WSMsgType.BINARY:
+                            data = msgpack.unpackb(msg.data, raw=False)
+                        else:
+                            data = _loads(msg.data)
+                    except ValueError:
+                        # JSONDecodeError and msgpack's unpack errors are ValueErrors
+                        logger.error(f"Invalid message received: {msg.data!r}")
+                        continue
+                    await self.handle_websocket_message(ws, data)
                 elif msg.type == WSMsgType.ERROR:
                     logger.error(f'WebSocket error: {ws.exception()}')
         except Exception as e:
             logger.error(f"WebSocket handler error: {e}")
         finally:
-            if ws in self.websockets:
-                self.websockets.remove(ws)
+            writer.cancel()
+            self._queues.pop(ws, None)
+            self.websockets.discard(ws)
             logger.info(f"WebSocket disconnected. Total: {len(self.websockets)}")
         
         return ws
@@ -120,21 +299,18 @@ class ConvictionWebBridge:
             logger.info(f"  Card: {card}")
             
             # Store the submission (in a real game, validate and process)
-            if not hasattr(self, 'turn_submissions'):
-                self.turn_submissions = {}
-            
             self.turn_submissions[bloc] = {
                 'budget': budget,
                 'card': card,
-                'timestamp': asyncio.get_event_loop().time()
+                'timestamp': time.monotonic()
             }
             
             # Send confirmation
-            await ws.send_str(json.dumps({
+            await self.send_message(ws, {
                 'type': 'turn_submitted',
                 'bloc': bloc,
                 'accepted': True
-            }))
+            })
             
             # Check if all players submitted
             if len(self.turn_submissions) == 3:
@@ -145,10 +321,6 @@ class ConvictionWebBridge:
         """Handle player bloc assignment request."""
         # For demo purposes, assign blocs in round-robin fashion
         # In a real game, you'd have proper player assignment logic
-        
-        if not hasattr(self, 'assignment_counter'):
-            self.assignment_counter = 0
-        
         blocs = ['USA', 'EU', 'China']
         gdp_values = {'USA': 100, 'EU': 80, 'China': 90}  # Demo GDP values
         
@@ -159,11 +331,11 @@ class ConvictionWebBridge:
         logger.info(f"Assigned player to {assigned_bloc} (assignment #{self.assignment_counter})")
         
         # Send the assignment back to the client
-        await ws.send_str(json.dumps({
+        await self.send_message(ws, {
             'type': 'player_bloc',
             'bloc': assigned_bloc,
             'gdp': gdp_values[assigned_bloc]
-        }))
+        })
     
     async def handle_game_start(self, ws: web.WebSocketResponse, data: Dict):
         """Handle game start request from setup screen."""
@@ -180,8 +352,6 @@ class ConvictionWebBridge:
                 self.game.victory_threshold = config.get('victoryPoints', 50)
         
         # Store game configuration
-        if not hasattr(self, 'game_config'):
-            self.game_config = {}
         self.game_config.update(config)
         
         # Set up AI opponents if enabled
@@ -190,11 +360,11 @@ class ConvictionWebBridge:
             # In a real implementation, you'd initialize AI players here
         
         # Send confirmation back to the requesting client
-        await ws.send_str(json.dumps({
+        await self.send_message(ws, {
             'type': 'game_started',
             'config': config,
             'player_bloc': player_bloc
-        }))
+        })
         
         # Broadcast game start to all clients
         await self.broadcast_update('game_started', {
@@ -214,101 +384,330 @@ class ConvictionWebBridge:
         
         # Clear submissions for next turn
         self.turn_submissions = {}
+        turn = getattr(self.game, 'turn', 1)
         
         # Broadcast phase change
         await self.broadcast_update('phase_update', {
-            'turn': getattr(self.game, 'turn', 1),
+            'turn': turn,
             'phase': 'Resolution'
         })
         
         # After processing, return to planning phase
         await asyncio.sleep(3)
         await self.broadcast_update('phase_update', {
-            'turn': getattr(self.game, 'turn', 1) + 1,
+            'turn': turn + 1,
             'phase': 'Planning'
         })
     
     async def get_game_state(self, request):
         """HTTP endpoint to get current game state."""
         if not self.game:
-            return web.json_response({'error': 'No game loaded'}, status=400)
+            return _json_response({'error': 'No game loaded'}, status=400)
         
         state = self.serialize_game_state()
-        return web.json_response(state)
+        return _json_response(state)
     
     async def handle_action(self, request):
         """HTTP endpoint to handle game actions."""
         if not self.game:
-            return web.json_response({'error': 'No game loaded'}, status=400)
+            return _json_response({'error': 'No game loaded'}, status=400)
         
         try:
-            data = await request.json()
+            data = await request.json(loads=_loads)
             result = await self.process_game_action(data)
-            return web.json_response({'success': True, 'result': result})
+            return _json_response({'success': True, 'result': result})
         except Exception as e:
             logger.error(f"Action handling error: {e}")
-            return web.json_response({'error': str(e)}, status=500)
+            return _json_response({'error': str(e)}, status=500)
     
     def serialize_game_state(self) -> Dict:
-        """Convert game state to JSON-serializable format."""
+        """Convert game state to JSON-serializable format (cached while unchanged).
+        
+        The returned dict is shared with the cache and must not be mutated.
+        """
         if not self.game:
             return {}
         
+        version = self._sync_state_version()
+        state, cached = self._state_cache
+        if cached == version:
+            return state
+        
+        state = self._build_state()
+        self._state_cache = (state, version)
+        return state
+    
+    def _build_state(self) -> Dict:
+        # Any object with provinces and powers can be shown; turn, phase
+        # and game_over are optional, so read each of them once here
+        game = self.game
+        
         # Convert regions (using provinces from the game)
-        regions_data = []
-        for region_name, region in self.game.provinces.items():
-            regions_data.append({
-                'name': region_name,
-                'owner': region.controller or 'Neutral',
-                'die': 3  # Default die value for visualization
-            })
+        regions_data = [self._region_entry(region_name, region)
+                        for region_name, region in game.provinces.items()]
+        self._region_index = {region_name: i for i, region_name in enumerate(game.provinces)}
         
         # Convert blocs
-        blocs_data = []
-        for bloc in self.game.powers.values():
-            blocs_data.append(bloc.to_dict())
+        blocs_data = [bloc.to_dict() for bloc in game.powers.values()]
         
         return {
-            'turn': getattr(self.game, 'turn', 1),
-            'phase': getattr(self.game, 'phase', 'Planning'),
+            'turn': getattr(game, 'turn', 1),
+            'phase': getattr(game, 'phase', 'Planning'),
             'regions': regions_data,
             'blocs': blocs_data,
-            'game_over': getattr(self.game, 'game_over', False)
+            'game_over': getattr(game, 'game_over', False)
         }
     
-    async def send_game_state(self, ws: web.WebSocketResponse):
-        """Send current game state to a WebSocket client."""
-        state = self.serialize_game_state()
-        message = {
-            'type': 'full_state',
-            'data': state
+    @staticmethod
+    def _region_entry(region_name: str, region) -> Dict:
+        return {
+            'name': region_name,
+            'owner': region.controller or 'Neutral',
+            'die': 3  # Default die value for visualization
         }
+    
+    def _game_key(self) -> Tuple:
+        """Everything about the game whose change makes the cached state stale.
+        
+        Field assignments on any model bump models.mutation_count(); the
+        game's own turn, phase and game_over are compared directly.
+        """
+        game = self.game
+        return (mutation_count(), id(game), getattr(game, 'turn', 1),
+                getattr(game, 'phase', 'Planning'), getattr(game, 'game_over', False),
+                len(getattr(game, 'provinces', ())), len(getattr(game, 'powers', ())))
+    
+    def _sync_state_version(self) -> int:
+        """Bump the state version if the game changed since the last call.
+        
+        Assignments that leave the serialized state as it was (a value
+        clamped back to itself, say) keep the version, so clients are not
+        sent empty deltas or pushed into a resync.
+        """
+        key = self._game_key()
+        if key != self._seen_game:
+            self._seen_game = key
+            state, cached = self._state_cache
+            fresh = self._build_state() if self.game else {}
+            if cached != self._state_version or fresh != state:
+                self._state_version += 1
+                self._state_cache = (fresh, self._state_version)
+        return self._state_version
+    
+    def _refresh_region(self, region_name: str):
+        """Bump the state version, reusing the cached state if only this region changed.
+        
+        Call _sync_state_version() before changing the region, so that any
+        other change is not mistaken for this one.
+        """
+        state, version = self._state_cache
+        self.invalidate_state_cache()
+        # The bump above accounts for this region's change
+        self._seen_game = self._game_key()
+        if version != self._state_version - 1 or region_name not in self._region_index:
+            return  # Cache was already stale; the next read rebuilds it
+        
+        # Copy-on-write: earlier states may still be held (e.g. by
+        # state_patch), so build a new top level and regions list rather
+        # than editing the cached ones, and leave blocs shared
+        regions = list(state['regions'])
+        regions[self._region_index[region_name]] = self._region_entry(
+            region_name, self.game.provinces[region_name])
+        self._state_cache = (dict(state, regions=regions), self._state_version)
+    
+    def state_patch(self) -> List[Dict]:
+        """JSON Patch ops from the previous state_patch() call to the current state."""
+        version = self._sync_state_version()
+        if self._patch_version == version:
+            return []
         
-        try:
-            await ws.send_str(json.dumps(message))
-        except Exception as e:
-            logger.error(f"Error sending game state: {e}")
+        self._patch_version = version
+        state = self.serialize_game_state()
+        ops = _json_diff(self._last_state, state)
+        # Serialized states are never mutated in place (each version is
+        # rebuilt or copied on write, and to_dict() copies model lists), so
+        # the snapshot can share the cached dict without a copy
+        self._last_state = state
+        return ops
+    
+    def state_delta(self) -> Optional[Dict]:
+        """A versioned 'patch' message for state_patch(), or None if nothing changed.
+        
+        Clients apply it only if their state is at version 'from' (the
+        version of their last full state or patch), and otherwise resync
+        with get_state.
+        """
+        base = self._patch_version
+        ops = self.state_patch()
+        if not ops:
+            return None
+        return {'type': 'patch', 'ops': ops, 'from': base, 'version': self._patch_version}
+    
+    async def broadcast_state_delta(self):
+        """Broadcast what changed since the last delta instead of the full state."""
+        message = self.state_delta()
+        if message is None:
+            return
+        if self._pending_events is not None:
+            self._pending_events.append(message)
+            return
+        await self._broadcast_payload(_dumps(message))
+    
+    async def send_game_state(self, ws: web.WebSocketResponse):
+        """Send current game state to a WebSocket client.
+        
+        Connected clients are first sent the delta up to this state, so the
+        next delta applies from the version this client receives too.
+        """
+        if self._patch_version != self._sync_state_version():
+            await self.broadcast_state_delta()
+        
+        # Every client connecting between two state changes gets the same bytes
+        payload, version = self._full_state_payload_cache
+        if version != self._sync_state_version():
+            payload = _dumps({
+                'type': 'full_state',
+                'data': self.serialize_game_state(),
+                'version': self._state_version
+            })
+            self._full_state_payload_cache = (payload, self._state_version)
+        self._enqueue(ws, payload)
+    
+    async def send_message(self, ws: web.WebSocketResponse, message: Dict):
+        """Queue a message for a single WebSocket client."""
+        self._enqueue(ws, _dumps(message))
     
     async def broadcast_update(self, update_type: str, data: Dict):
         """Broadcast an update to all connected WebSocket clients."""
-        message = {
-            'type': update_type,
-            'data': data
-        }
+        if self._pending_events is not None:
+            self._pending_events.append({
+                'type': update_type,
+                'data': data
+            })
+            return
         
-        # Remove disconnected websockets
-        active_websockets = []
-        for ws in self.websockets:
-            if ws.closed:
-                continue
-            
-            try:
-                await ws.send_str(json.dumps(message))
-                active_websockets.append(ws)
-            except Exception as e:
-                logger.error(f"Error broadcasting to websocket: {e}")
+        # Only data varies per call; the envelope bytes are cached per type
+        await self._broadcast_payload(_envelope_prefix(update_type) + _dumps(data) + b'}')
+    
+    async def broadcast_game_state(self):
+        """Broadcast the full game state, encoding it at most once per state change."""
+        self._sync_state_version()
+        if self._pending_events is not None:
+            self._pending_events.append({
+                'type': 'game_state',
+                'data': self.serialize_game_state(),
+                'version': self._state_version
+            })
+            return
+        
+        payload, version = self._state_payload_cache
+        if version != self._state_version:
+            payload = _dumps({
+                'type': 'game_state',
+                'data': self.serialize_game_state(),
+                'version': self._state_version
+            })
+            self._state_payload_cache = (payload, self._state_version)
+            if logger.isEnabledFor(logging.DEBUG):
+                # Evidence for whether enabling compress= would pay off
+                logger.debug(f"game_state payload: {len(payload)} bytes, "
+                             f"{len(zlib.compress(payload))} deflated")
+        await self._broadcast_payload(payload)
+    
+    def start_batch(self):
+        """Hold broadcasts back until flush_batch() sends them as one frame."""
+        if self._pending_events is None:
+            self._pending_events = []
+    
+    async def flush_batch(self):
+        """Send every held-back broadcast to clients as a single 'batch' message."""
+        events, self._pending_events = self._pending_events, None
+        if events:
+            await self._broadcast_payload(_dumps({
+                'type': 'batch',
+                'data': events
+            }))
+    
+    def invalidate_state_cache(self):
+        """Mark cached state and payloads stale.
+        
+        Model field assignments and the game's turn/phase are tracked
+        automatically; this is only needed for changes they can't see,
+        such as editing a bloc's satellites list in place.
+        """
+        self._state_version += 1
+    
+    async def _broadcast_payload(self, payload: bytes):
+        """Send an already-encoded message to all connected WebSocket clients."""
+        # Each client's writer sends independently, so a slow socket only
+        # delays its own queue and never the broadcaster
+        if len(self.websockets) <= BROADCAST_BATCH:
+            # Nothing awaits below, so the set can't change mid-iteration
+            for ws in self.websockets:
+                self._enqueue(ws, payload)
+            return
+        
+        clients = list(self.websockets)
+        for i in range(0, len(clients), BROADCAST_BATCH):
+            for ws in clients[i:i + BROADCAST_BATCH]:
+                self._enqueue(ws, payload)
+            if i + BROADCAST_BATCH < len(clients):
+                # Let player actions and the writers run between large batches
+                await asyncio.sleep(0)
+    
+    def _enqueue(self, ws: web.WebSocketResponse, payload: bytes):
+        """Hand a payload to a client's writer without waiting on the socket."""
+        queue = self._queues.get(ws)
+        if queue is None or ws.closed:
+            return
+        
+        if queue.full():
+            # Drop the oldest message rather than buffer without bound
+            queue.get_nowait()
+            logger.warning("Send queue full; dropping oldest message for slow client")
+        queue.put_nowait(payload)
+    
+    async def _writer(self, ws: web.WebSocketResponse, queue: asyncio.Queue, encode=None):
+        """Drain one client's queue; the only coroutine that sends on its socket.
         
-        self.websockets = active_websockets
+        Payloads are queued as JSON; encode, if given, converts each frame
+        to the client's wire format just before sending.
+        """
+        while True:
+            payload = await queue.get()
+            if not queue.empty():
+                # Merge a burst into one 'batch' frame; the payloads are
+                # already JSON, so they are spliced in without re-encoding
+                payloads = [payload]
+                while not queue.empty():
+                    payloads.append(queue.get_nowait())
+                payload = b'{"type":"batch","data":[' + b','.join(payloads) + b']}'
+            if encode is not None:
+                payload = encode(payload)
+            if not await self._safe_send(ws, payload):
+                # Dead or stalled client: closing ends its handler, which cleans up
+                await ws.close()
+                return
+    
+    async def _close_websockets(self, app: web.Application):
+        """Close every client at once on shutdown instead of one after another."""
+        await asyncio.gather(
+            *(ws.close(code=WSCloseCode.GOING_AWAY, message=b'Server shutdown')
+              for ws in list(self.websockets)),
+            return_exceptions=True
+        )
+    
+    async def _safe_send(self, ws: web.WebSocketResponse, payload: bytes) -> bool:
+        """Send a payload to one client, returning False if the socket is gone."""
+        if ws.closed:
+            return False
+        
+        try:
+            await asyncio.wait_for(ws.send_bytes(payload), timeout=SEND_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.error(f"Error broadcasting to websocket: {e}")
+            return False
     
     async def process_game_action(self, action_data: Dict):
         """Process a game action and broadcast updates."""
@@ -342,12 +741,15 @@ class ConvictionWebBridge:
     async def update_region(self, region_name: str, new_owner: str, die_value: int = 3):
         """Update a region's controller and notify all clients."""
         if self.game and hasattr(self.game, 'provinces') and region_name in self.game.provinces:
+            self._sync_state_version()
             self.game.provinces[region_name].controller = new_owner
+            self._refresh_region(region_name)
         await self.notify_region_change(region_name, new_owner, die_value)
     
     def set_game(self, game: 'ConvictionGame'):
         """Set the game instance for the bridge."""
         self.game = game
+        self.invalidate_state_cache()
     
     async def run(self, host='localhost', port=8080):
         """Start the web server."""
@@ -362,23 +764,72 @@ class ConvictionWebBridge:
         
         return runner
 
-# Standalone server for testing
-async def run_standalone_server():
-    """Run the web bridge as a standalone server for testing."""
-    bridge = ConvictionWebBridge()
+def _json_diff(old, new, path: str = '') -> List[Dict]:
+    """Minimal RFC 6902 patch turning ``old`` into ``new``.
+    
+    Dicts are diffed key by key and lists index by index, with items past
+    the shorter list added or removed at the end; any other change replaces
+    the value.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({'op': 'remove', 'path': f"{path}/{_pointer_token(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_pointer_token(key)}"
+            if key in old:
+                ops.extend(_json_diff(old[key], value, child))
+            else:
+                ops.append({'op': 'add', 'path': child, 'value': value})
+        return ops
+    
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            ops.extend(_json_diff(a, b, f"{path}/{i}"))
+        for i in range(len(old), len(new)):
+            ops.append({'op': 'add', 'path': f"{path}/{i}", 'value': new[i]})
+        # Remove from the end backwards so each index is valid when applied
+        for i in reversed(range(len(new), len(old))):
+            ops.append({'op': 'remove', 'path': f"{path}/{i}"})
+        return ops
+    
+    if type(old) is type(new) and old == new:
+        return []
+    return [{'op': 'replace', 'path': path, 'value': new}]
+
+
+def _pointer_token(key) -> str:
+    """Escape a dict key for use in a JSON Pointer path."""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def install_uvloop() -> bool:
+    """Use uvloop's event loop for later asyncio.run() calls if it is installed."""
+    try:
+        import uvloop
+    except ImportError:
+        return False
     
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+def _demo_game():
+    """Build the dummy game state the standalone server shows."""
     # Create a dummy game state for demonstration
     dummy_game = type('DummyGame', (), {})()
     dummy_game.turn = 1
     dummy_game.phase = 'Planning'
     dummy_game.game_over = False
     
-    # Create some dummy regions (using province names from game)
+    # Create some dummy regions (using province names from game); real
+    # Province instances are slotted, unlike ad-hoc classes
     dummy_game.provinces = {
-        "North": type('Province', (), {'name': 'North', 'controller': 'Red'}),
-        "South": type('Province', (), {'name': 'South', 'controller': 'Blue'}),
-        "East": type('Province', (), {'name': 'East', 'controller': None}),
-        "West": type('Province', (), {'name': 'West', 'controller': None}),
+        "North": Province("North", controller='Red'),
+        "South": Province("South", controller='Blue'),
+        "East": Province("East"),
+        "West": Province("West"),
     }
     
     # Create dummy blocs
@@ -386,19 +837,42 @@ async def run_standalone_server():
         'Red': Bloc('Red'),
         'Blue': Bloc('Blue')
     }
+    return dummy_game
+
+
+def create_app(argv=None) -> web.Application:
+    """App factory for aiohttp's runner, e.g. under PyPy:
     
-    bridge.set_game(dummy_game)
+        pypy3 -m aiohttp.web -H localhost -P 8080 web_bridge:create_app
+    """
+    return ConvictionWebBridge(_demo_game()).app
+
+
+# Standalone server for testing
+async def run_standalone_server():
+    """Run the web bridge as a standalone server for testing."""
+    bridge = ConvictionWebBridge()
+    bridge.set_game(_demo_game())
+    
+    runner = await bridge.run()
+    
+    # Serve until Ctrl+C / SIGTERM sets the shutdown event
+    loop = asyncio.get_running_loop()
+    shutdown = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown.set)
+        except NotImplementedError:
+            # Windows event loops have no signal handlers; Ctrl+C still
+            # cancels the task and falls through to cleanup below
+            pass
     
     try:
-        runner = await bridge.run()
-        
-        # Keep running until interrupted
-        while True:
-            await asyncio.sleep(1)
-            
-    except KeyboardInterrupt:
+        await shutdown.wait()
         logger.info("Shutting down server...")
+    finally:
         await runner.cleanup()
 
 if __name__ == '__main__':
+    install_uvloop()
     asyncio.run(run_standalone_server())